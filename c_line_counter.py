@@ -1,10 +1,27 @@
-from typing import Dict
 import cv2
 import numpy as np
 from supervision.detection.core import Detections
 from supervision.draw.color import Color
 from supervision.geometry.core import Point, Rect, Vector, Position
-from typing import Optional
+from typing import Dict, List, Optional
+from weakref import WeakKeyDictionary
+
+# Bit flags packed into custom_LineZone._state, one byte per tracker slot
+_KNOWN = 1  # Slot is in use by a tracker_id seen within the line segment
+_SIDE = 2  # Last recorded side of the line (set when Vector.is_in is True)
+_COUNTED = 4  # Crossing already counted, waiting for the grace period
+
+_LINE_MARGIN = 20  # Margin around the line segment within which anchors are considered
+
+
+def _center_anchors(xyxy: np.ndarray):
+    """Center points (x, y arrays) of the bounding boxes."""
+    return (xyxy[:, 0] + xyxy[:, 2]) * 0.5, (xyxy[:, 1] + xyxy[:, 3]) * 0.5
+
+
+def _bottom_center_anchors(xyxy: np.ndarray):
+    """Bottom center points (x, y arrays) of the bounding boxes."""
+    return (xyxy[:, 0] + xyxy[:, 2]) * 0.5, xyxy[:, 3]
 
 
 class custom_LineZone:
@@ -12,14 +29,21 @@ class custom_LineZone:
         self.config = config
         self.name = name
         self.vector = Vector(start=start, end=end)
-        self.tracker_state: Dict[str, bool] = {}
-        self.already_counted: Dict[str, bool] = {}  # Flag for each tracker_id
-        self.frame_last_seen: Dict[str, int] = {}  # Last frame each tracker_id was encountered
+        # ANCHOR_POINT is fixed for the run, so pick the anchor function once
+        self._anchor_fn = _center_anchors if config["ANCHOR_POINT"] == "center" else _bottom_center_anchors  # Default to bottom_center
+        self._line_key = None  # Endpoints of self.vector the cached line values were derived from
+        self._sync_line()
+        self._slots: Dict[int, int] = {}  # Slot of each tracker_id in the tables below
+        self._free_slots: List[int] = list(range(255, -1, -1))  # Unused slots, lowest popped first
+        self._slot_ids = np.zeros(256, dtype=np.int64)  # tracker_id held by each slot
+        self._state = np.zeros(256, dtype=np.int8)  # Packed _KNOWN/_SIDE/_COUNTED flags per slot
+        self._last_seen = np.zeros(256, dtype=np.int32)  # Last frame each tracker_id was counted or first seen
+        self._seen = np.zeros(256, dtype=np.int32)  # Last frame each tracker_id was within the line segment
         self.current_frame: int = 0  # Current frame counter
         self.in_count: int = 0
         self.out_count: int = 0
         self.grace_period = grace_period  # Number of frames to wait before resetting
-    def is_within_line_segment(self, point: Point, margin: float = 20) -> bool:
+    def is_within_line_segment(self, point: Point, margin: float = _LINE_MARGIN) -> bool:
         """
         Check if a point is within the line segment.
 
@@ -36,54 +60,136 @@ class custom_LineZone:
         return x_within and y_within
 
 
+    def _sync_line(self):
+        """
+        Refresh the cached line endpoints and bounds when self.vector has been reassigned or mutated.
+        """
+        start, end = self.vector.start, self.vector.end
+        line_key = (start.x, start.y, end.x, end.y)
+        if line_key == self._line_key:
+            return
+        self._line_key = line_key
+        # Line endpoints as float32 scalars, matching the dtype of detections.xyxy
+        self._sx, self._sy = np.float32(start.x), np.float32(start.y)
+        self._ex, self._ey = np.float32(end.x), np.float32(end.y)
+        # Line segment bounds widened by _LINE_MARGIN, as (x0, y0, x1, y1)
+        self._bbox = (
+            min(self._sx, self._ex) - _LINE_MARGIN,
+            min(self._sy, self._ey) - _LINE_MARGIN,
+            max(self._sx, self._ex) + _LINE_MARGIN,
+            max(self._sy, self._ey) + _LINE_MARGIN,
+        )
+
     def trigger(self, detections: Detections):
+        """
+        Update the in/out counts with the detections of the next frame.
+
+        Detections with a negative tracker_id (tentative or unmatched tracks) are ignored
+        and never counted, since they do not identify a single object. A tracker_id that has
+        not been within the line segment for longer than grace_period is forgotten, and is
+        treated as a new object if it comes back.
+
+        Attributes:
+            detections (Detections): The tracked detections of the frame.
+        """
         self.current_frame += 1  # Increment frame counter
 
-        for xyxy, _, confidence, class_id, tracker_id in detections:
-            # handle detections with no tracker_id
-            if tracker_id is None:
-                continue
+        # handle detections with no tracker_id
+        tracker_ids = detections.tracker_id
+        if tracker_ids is None or len(detections) == 0:
+            return
 
-            # we check if the bottom center anchor of bbox is on the same side of vector
-            x1, y1, x2, y2 = xyxy
-            if self.config["ANCHOR_POINT"] == "center":
-                anchor = Point(x=(x1+x2)/2, y=(y1+y2)/2)  # Center point of bounding box
-            else:  # Default to bottom_center
-                anchor = Point(x=(x1+x2)/2, y=y2)  # Bottom center point of bounding box
-            # Check if anchor is within the line segment
-            if not self.is_within_line_segment(anchor):
-                continue
+        self._sync_line()
+
+        # anchors for all detections at once, bottom center or center of bbox
+        anchor_x, anchor_y = self._anchor_fn(detections.xyxy)
 
-            tracker_state = self.vector.is_in(point=anchor)
+        # vectorized is_within_line_segment, skip the zone when no anchor is near the line
+        # negative ids (tentative or unmatched tracks) are skipped
+        x0, y0, x1, y1 = self._bbox
+        within = (tracker_ids >= 0) & (anchor_x >= x0) & (anchor_x <= x1) & (anchor_y >= y0) & (anchor_y <= y1)
+        if not within.any():
+            return
+        candidates = np.flatnonzero(within)
+        anchor_x, anchor_y = anchor_x[candidates], anchor_y[candidates]
+
+        # vectorized Vector.is_in: sign of the cross product of (start->end, start->anchor)
+        sx, sy, ex, ey = self._sx, self._sy, self._ex, self._ey
+        sides = (ex - sx) * (anchor_y - sy) - (ey - sy) * (anchor_x - sx) < 0
+
+        self._release_stale_slots()
+
+        # plain Python ints/bools for the scalar state machine, no per-detection numpy scalars
+        for tracker_id, tracker_state in zip(tracker_ids[candidates].tolist(), sides.tolist()):
+            side_flag = _SIDE if tracker_state else 0
+            slot = self._slots.get(tracker_id)
 
             # handle new detection
-            if tracker_id not in self.tracker_state:
-                self.tracker_state[tracker_id] = tracker_state
-                self.already_counted[tracker_id] = False  # When the object appears, it has not been counted yet
-                self.frame_last_seen[tracker_id] = self.current_frame  # Update last seen frame
+            if slot is None:
+                slot = self._acquire_slot(tracker_id)
+                self._state[slot] = _KNOWN | side_flag  # When the object appears, it has not been counted yet
+                self._last_seen[slot] = self.current_frame  # Update last seen frame
+                self._seen[slot] = self.current_frame
                 continue
 
+            self._seen[slot] = self.current_frame
+            state = self._state[slot]
+
             # handle detection on the same side of the line
-            if self.tracker_state.get(tracker_id) == tracker_state:
+            if (state & _SIDE) == side_flag:
                 continue
 
             # check if this crossing has already been counted
-            if self.already_counted.get(tracker_id, False):  # If it has been counted, we skip this
+            if state & _COUNTED:  # If it has been counted, we skip this
                 # Check if grace period has passed since last encounter
-                if self.current_frame - self.frame_last_seen.get(tracker_id, 0) > self.grace_period:
-                    self.already_counted[tracker_id] = False  # Reset after grace period
-                else:
+                if self.current_frame - self._last_seen[slot] <= self.grace_period:
                     continue
 
-            self.tracker_state[tracker_id] = tracker_state
-            self.already_counted[tracker_id] = True  # After counting, we mark this crossing as already counted
-            self.frame_last_seen[tracker_id] = self.current_frame  # Update last seen frame
+            # After counting, we mark this crossing as already counted
+            self._state[slot] = _KNOWN | side_flag | _COUNTED
+            self._last_seen[slot] = self.current_frame  # Update last seen frame
 
             if tracker_state:
                 self.in_count += 1
             else:
                 self.out_count += 1
 
+    def _acquire_slot(self, tracker_id: int) -> int:
+        """
+        Assign a free slot in the tracker tables to tracker_id, doubling the tables when all slots are in use.
+
+        Attributes:
+            tracker_id (int): The tracker_id that needs a slot.
+
+        Returns:
+            int: The slot assigned to tracker_id.
+        """
+        if not self._free_slots:
+            size = len(self._state)
+            self._slot_ids = np.concatenate([self._slot_ids, np.zeros(size, dtype=self._slot_ids.dtype)])
+            self._state = np.concatenate([self._state, np.zeros(size, dtype=self._state.dtype)])
+            self._last_seen = np.concatenate([self._last_seen, np.zeros(size, dtype=self._last_seen.dtype)])
+            self._seen = np.concatenate([self._seen, np.zeros(size, dtype=self._seen.dtype)])
+            self._free_slots = list(range(2 * size - 1, size - 1, -1))
+        slot = self._free_slots.pop()
+        self._slots[tracker_id] = slot
+        self._slot_ids[slot] = tracker_id
+        return slot
+
+    def _release_stale_slots(self):
+        """
+        Free the slots of tracker_ids that have not been within the line segment for longer than grace_period,
+        so the tables are sized by the number of live tracks rather than by the largest tracker_id.
+        """
+        if not self._slots:
+            return
+        stale = np.flatnonzero((self._state & _KNOWN).astype(bool) & (self.current_frame - self._seen > self.grace_period))
+        if len(stale) == 0:
+            return
+        for tracker_id in self._slot_ids[stale].tolist():
+            del self._slots[tracker_id]
+        self._state[stale] = 0
+        self._free_slots.extend(stale[::-1].tolist())
 
 
 class custom_LineZoneAnnotator:
@@ -121,6 +227,9 @@ class custom_LineZoneAnnotator:
         self.text_padding: int = text_padding
         self.custom_in_text: str = custom_in_text
         self.custom_out_text: str = custom_out_text
+        self._bgr = color.as_bgr()  # Line and text background color, converted once
+        self._text_bgr = text_color.as_bgr()  # Text color, converted once
+        self._layout_cache: WeakKeyDictionary = WeakKeyDictionary()  # Layout per line counter
 
     def annotate(self, frame: np.ndarray, line_counter: custom_LineZone) -> np.ndarray:
         """
@@ -134,35 +243,91 @@ class custom_LineZoneAnnotator:
             np.ndarray: The image with the line drawn on it.
 
         """
+        in_text = f"{self.custom_in_text}: {line_counter.in_count}" if self.custom_in_text is not None else f"in: {line_counter.in_count}"
+        out_text = f"{self.custom_out_text}: {line_counter.out_count}" if self.custom_out_text is not None else f"out: {line_counter.out_count}"
+        layout = self._get_layout(line_counter, in_text, out_text)
+
         cv2.line(
             frame,
-            line_counter.vector.start.as_xy_int_tuple(),
-            line_counter.vector.end.as_xy_int_tuple(),
-            self.color.as_bgr(),
+            layout["start"],
+            layout["end"],
+            self._bgr,
             self.thickness,
             lineType=cv2.LINE_AA,
             shift=0,
         )
         cv2.circle(
             frame,
-            line_counter.vector.start.as_xy_int_tuple(),
+            layout["start"],
             radius=5,
-            color=self.color.as_bgr(),
+            color=self._bgr,
             thickness=-1,
             lineType=cv2.LINE_AA,
         )
         cv2.circle(
             frame,
-            line_counter.vector.end.as_xy_int_tuple(),
+            layout["end"],
             radius=5,
-            color=self.color.as_bgr(),
+            color=self._bgr,
             thickness=-1,
             lineType=cv2.LINE_AA,
         )
 
-        in_text = f"{self.custom_in_text}: {line_counter.in_count}" if self.custom_in_text is not None else f"in: {line_counter.in_count}"
-        out_text = f"{self.custom_out_text}: {line_counter.out_count}" if self.custom_out_text is not None else f"out: {line_counter.out_count}"
+        cv2.rectangle(
+            frame,
+            layout["in_background_top_left"],
+            layout["in_background_bottom_right"],
+            self._bgr,
+            -1,
+        )
+        cv2.rectangle(
+            frame,
+            layout["out_background_top_left"],
+            layout["out_background_bottom_right"],
+            self._bgr,
+            -1,
+        )
 
+        cv2.putText(
+            frame,
+            in_text,
+            layout["in_origin"],
+            cv2.FONT_HERSHEY_SIMPLEX,
+            self.text_scale,
+            self._text_bgr,
+            self.text_thickness,
+            cv2.LINE_AA,
+        )
+        cv2.putText(
+            frame,
+            out_text,
+            layout["out_origin"],
+            cv2.FONT_HERSHEY_SIMPLEX,
+            self.text_scale,
+            self._text_bgr,
+            self.text_thickness,
+            cv2.LINE_AA,
+        )
+        return frame
+
+    def _get_layout(self, line_counter: custom_LineZone, in_text: str, out_text: str) -> dict:
+        """
+        Get the integer coordinates of the line, text backgrounds and text origins,
+        reusing the layout of the previous frame while the line and texts are unchanged.
+
+        Attributes:
+            line_counter (LineCounter): The line counter that will be drawn.
+            in_text (str): The in count text that will be drawn.
+            out_text (str): The out count text that will be drawn.
+
+        Returns:
+            dict: The cached layout for the line counter.
+        """
+        start, end = line_counter.vector.start, line_counter.vector.end
+        key = (start.x, start.y, end.x, end.y, in_text, out_text)
+        layout = self._layout_cache.get(line_counter)
+        if layout is not None and layout["key"] == key:
+            return layout
 
         (in_text_width, in_text_height), _ = cv2.getTextSize(
             in_text, cv2.FONT_HERSHEY_SIMPLEX, self.text_scale, self.text_thickness
@@ -172,21 +337,21 @@ class custom_LineZoneAnnotator:
         )
 
         in_text_x = int(
-            (line_counter.vector.end.x + line_counter.vector.start.x - in_text_width)
+            (end.x + start.x - in_text_width)
             / 2
         )
         in_text_y = int(
-            (line_counter.vector.end.y + line_counter.vector.start.y + in_text_height)
+            (end.y + start.y + in_text_height)
             / 2
             - self.text_offset * in_text_height
         )
 
         out_text_x = int(
-            (line_counter.vector.end.x + line_counter.vector.start.x - out_text_width)
+            (end.x + start.x - out_text_width)
             / 2
         )
         out_text_y = int(
-            (line_counter.vector.end.y + line_counter.vector.start.y + out_text_height)
+            (end.y + start.y + out_text_height)
             / 2
             + self.text_offset * out_text_height
         )
@@ -204,39 +369,16 @@ class custom_LineZoneAnnotator:
             height=out_text_height,
         ).pad(padding=self.text_padding)
 
-        cv2.rectangle(
-            frame,
-            in_text_background_rect.top_left.as_xy_int_tuple(),
-            in_text_background_rect.bottom_right.as_xy_int_tuple(),
-            self.color.as_bgr(),
-            -1,
-        )
-        cv2.rectangle(
-            frame,
-            out_text_background_rect.top_left.as_xy_int_tuple(),
-            out_text_background_rect.bottom_right.as_xy_int_tuple(),
-            self.color.as_bgr(),
-            -1,
-        )
-
-        cv2.putText(
-            frame,
-            in_text,
-            (in_text_x, in_text_y),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            self.text_scale,
-            self.text_color.as_bgr(),
-            self.text_thickness,
-            cv2.LINE_AA,
-        )
-        cv2.putText(
-            frame,
-            out_text,
-            (out_text_x, out_text_y),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            self.text_scale,
-            self.text_color.as_bgr(),
-            self.text_thickness,
-            cv2.LINE_AA,
-        )
-        return frame
+        layout = {
+            "key": key,
+            "start": start.as_xy_int_tuple(),
+            "end": end.as_xy_int_tuple(),
+            "in_background_top_left": in_text_background_rect.top_left.as_xy_int_tuple(),
+            "in_background_bottom_right": in_text_background_rect.bottom_right.as_xy_int_tuple(),
+            "out_background_top_left": out_text_background_rect.top_left.as_xy_int_tuple(),
+            "out_background_bottom_right": out_text_background_rect.bottom_right.as_xy_int_tuple(),
+            "in_origin": (in_text_x, in_text_y),
+            "out_origin": (out_text_x, out_text_y),
+        }
+        self._layout_cache[line_counter] = layout
+        return layout